@@ -1,9 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import router
+from .routes import router, UploadSizeLimitMiddleware
 
 app = FastAPI(title="kg-foundry API", version="0.1.0")
 
+# Enforce the upload size limit while the body is received.
+# Registered before CORS so the 413 response still carries CORS headers.
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
-import shutil
+from neo4j.exceptions import ClientError
 import os
 import uuid
+import json
 import asyncio
+import hashlib
 from ..ingestion.loader import DocumentLoader
 from ..extraction.extractor import GraphExtractor
 from ..graph.client import Neo4jClient
@@ -13,12 +16,33 @@ from ..rag.retriever import GraphRetriever
 
 router = APIRouter()
 
+# Upload spooling configuration
+UPLOAD_DIR = os.getenv("KG_UPLOAD_DIR", "uploads")
+MAX_UPLOAD_BYTES = int(os.getenv("KG_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Allowance for multipart boundaries and part headers when checking Content-Length
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Raw query guards
+MAX_QUERY_ROWS = int(os.getenv("KG_QUERY_MAX_ROWS", "1000"))
+MAX_STREAM_ROWS = int(os.getenv("KG_QUERY_MAX_STREAM_ROWS", "100000"))
+
 # In-memory job storage
-# Format: {job_id: {"status": "pending"|"processing"|"completed"|"failed", "progress": 0, "result": None, "error": None}}
+# Format: {job_id: {"status": "pending"|"processing"|"completed"|"failed", "progress": 0, "result": None, "error": None, "sha256": str}}
 jobs: Dict[str, Dict[str, Any]] = {}
 
+# Content hash -> job_id, used to attach duplicate uploads to an existing job.
+# Only jobs whose graph is (or may still be) stored in Neo4j are kept here.
+jobs_by_hash: Dict[str, str] = {}
+
 class QueryRequest(BaseModel):
     query: str
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+    limit: Optional[int] = Field(default=None, gt=0)
+    timeout: Optional[float] = Field(default=None, gt=0)
+    read_only: bool = True
+    fetch_size: Optional[int] = Field(default=None, gt=0)
+    use_cache: bool = True
 
 class GraphResponse(BaseModel):
     entities: List[dict]
@@ -26,6 +50,7 @@ class GraphResponse(BaseModel):
 
 class JobResponse(BaseModel):
     job_id: str
+    duplicate: bool = False
 
 class JobStatus(BaseModel):
     job_id: str
@@ -34,6 +59,14 @@ class JobStatus(BaseModel):
     result: Optional[GraphResponse] = None
     error: Optional[str] = None
 
+def forget_job_hash(job_id: str):
+    """
+    Stop attaching duplicate uploads to this job, so they get processed again.
+    """
+    content_hash = jobs[job_id].get("sha256")
+    if content_hash and jobs_by_hash.get(content_hash) == job_id:
+        del jobs_by_hash[content_hash]
+
 def process_document(job_id: str, temp_file: str):
     """
     Background task to process the document.
@@ -81,12 +114,23 @@ def process_document(job_id: str, temp_file: str):
             
         # 4. Store
         jobs[job_id]["progress"] = 95.0
+        client = None
         try:
             client = Neo4jClient()
             client.add_graph(kg.entities, kg.relations)
-            client.close()
         except Exception as e:
             print(f"Storage skipped or failed: {e}")
+            # The graph was not (fully) stored, so a re-upload must not be deduplicated
+            forget_job_hash(job_id)
+        else:
+            # Centrality only affects RAG ranking; the graph itself is stored at this point
+            try:
+                client.update_centrality()
+            except Exception as e:
+                print(f"Centrality update failed: {e}")
+        finally:
+            if client is not None:
+                client.close()
 
         # Complete
         jobs[job_id]["result"] = {
@@ -103,29 +147,107 @@ def process_document(job_id: str, temp_file: str):
         if os.path.exists(temp_file):
             os.remove(temp_file)
 
+def upload_too_large_detail() -> str:
+    return f"File exceeds maximum upload size of {MAX_UPLOAD_BYTES} bytes"
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware enforcing MAX_UPLOAD_BYTES on /ingest while the body is received.
+
+    Requests with a Content-Length over the limit are rejected before any body is read.
+    Chunked or unknown-length bodies are counted as they arrive and aborted with 413 as
+    soon as they exceed the limit, so Starlette never spools more than that to disk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != "/ingest":
+            await self.app(scope, receive, send)
+            return
+
+        limit = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": upload_too_large_detail()})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Propagates out of request.form() and is rendered as a 413 response
+                    raise HTTPException(status_code=413, detail=upload_too_large_detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+async def spool_upload(file: UploadFile, dest: str) -> str:
+    """
+    Stream an upload to disk in chunks, returning its SHA-256 hex digest.
+    Raises HTTPException(413) if the upload exceeds MAX_UPLOAD_BYTES.
+    """
+    digest = hashlib.sha256()
+    size = 0
+
+    def write_chunk(buffer, chunk: bytes):
+        digest.update(chunk)
+        buffer.write(chunk)
+
+    with open(dest, "wb") as buffer:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=upload_too_large_detail())
+            # Hashing and disk I/O both stay off the event loop
+            await asyncio.to_thread(write_chunk, buffer, chunk)
+    return digest.hexdigest()
+
 @router.post("/ingest", response_model=JobResponse)
 async def ingest_document(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
     Upload a document and start background processing.
+    Uploads identical to a pending, processing or completed job attach to that job.
     """
     job_id = str(uuid.uuid4())
-    temp_file = f"temp_{job_id}_{file.filename}"
+    filename = os.path.basename(file.filename or "upload")
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    temp_file = os.path.join(UPLOAD_DIR, f"{job_id}_{filename}")
     
     try:
-        with open(temp_file, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        content_hash = await spool_upload(file, temp_file)
+
+        existing_id = jobs_by_hash.get(content_hash)
+        if existing_id is not None and jobs[existing_id]["status"] != "failed":
+            os.remove(temp_file)
+            return {"job_id": existing_id, "duplicate": True}
             
         jobs[job_id] = {
             "status": "pending",
             "progress": 0.0,
             "result": None,
-            "error": None
+            "error": None,
+            "sha256": content_hash
         }
+        jobs_by_hash[content_hash] = job_id
         
         background_tasks.add_task(process_document, job_id, temp_file)
         
         return {"job_id": job_id}
         
+    except HTTPException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
     except Exception as e:
         if os.path.exists(temp_file):
             os.remove(temp_file)
@@ -174,6 +296,8 @@ async def clear_graph():
         client = Neo4jClient()
         client.clear_database()
         client.close()
+        # Previously ingested documents are gone from the graph; allow re-ingesting them
+        jobs_by_hash.clear()
         return {"message": "Graph cleared successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -182,15 +306,75 @@ async def clear_graph():
 async def query_graph(request: QueryRequest):
     """
     Execute a raw Cypher query against Neo4j.
+    Runs read-only by default, with a transaction timeout and a row limit capped at KG_QUERY_MAX_ROWS.
     """
-    try:
+    limit = min(request.limit or MAX_QUERY_ROWS, MAX_QUERY_ROWS)
+
+    def run():
         client = Neo4jClient()
-        results = client.query(request.query)
+        try:
+            return client.run_query(
+                request.query,
+                request.parameters,
+                timeout=request.timeout,
+                limit=limit,
+                read_only=request.read_only,
+                fetch_size=request.fetch_size,
+                use_cache=request.use_cache
+            )
+        finally:
+            client.close()
+
+    try:
+        results, truncated = await asyncio.to_thread(run)
+        return {"results": results, "truncated": truncated}
+    except ClientError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/query/stream")
+async def query_graph_stream(request: QueryRequest):
+    """
+    Execute a raw Cypher query and stream the records as NDJSON.
+    The first record is fetched before responding, so errors such as invalid Cypher
+    or writes in read-only mode return 400/500 like /query. Errors raised after
+    streaming has started are emitted as a final {"error": ...} line.
+    """
+    limit = min(request.limit or MAX_STREAM_ROWS, MAX_STREAM_ROWS)
+    client = Neo4jClient()
+    records = client.stream_query(
+        request.query,
+        request.parameters,
+        timeout=request.timeout,
+        limit=limit,
+        read_only=request.read_only,
+        fetch_size=request.fetch_size
+    )
+
+    try:
+        first = await asyncio.to_thread(next, records, None)
+    except ClientError as e:
         client.close()
-        return {"results": results}
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        client.close()
         raise HTTPException(status_code=500, detail=str(e))
 
+    def generate():
+        try:
+            if first is not None:
+                yield json.dumps(first, default=str) + "\n"
+                for record in records:
+                    yield json.dumps(record, default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+        finally:
+            records.close()
+            client.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 class ChatRequest(BaseModel):
     message: str
 
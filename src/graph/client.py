@@ -1,11 +1,128 @@
 import os
-from neo4j import GraphDatabase
-from typing import List
+import re
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from neo4j import GraphDatabase, READ_ACCESS, WRITE_ACCESS
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 from ..extraction.schema import Entity, Relation
 
 load_dotenv()
 
+# Clauses that make a Cypher statement a write; used to decide cacheability and invalidation.
+# Deliberately conservative: a false positive only disables caching for that query.
+WRITE_CLAUSE_PATTERN = re.compile(
+    r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV|CALL)\b",
+    re.IGNORECASE
+)
+
+def is_write_query(cypher: str) -> bool:
+    """Return True if the Cypher statement may modify the graph."""
+    return bool(WRITE_CLAUSE_PATTERN.search(cypher))
+
+class QueryCache:
+    """
+    Thread-safe LRU cache for read-only query results with TTL expiry.
+    Any write through Neo4jClient invalidates the whole cache.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: "OrderedDict[tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(cypher: str, parameters: Optional[Dict[str, Any]], limit: Optional[int]) -> tuple:
+        return (cypher.strip(), json.dumps(parameters or {}, sort_keys=True, default=str), limit)
+
+    def get(self, key: tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: Any, generation: int):
+        """Store a value unless a write happened since `generation` was read."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+# Shared across clients, since the API creates a client per request
+query_cache = QueryCache(
+    max_entries=int(os.getenv("KG_QUERY_CACHE_SIZE", "128")),
+    ttl=float(os.getenv("KG_QUERY_CACHE_TTL", "300"))
+)
+
+# Minimum relative change in entity + relation count before PageRank is recomputed
+CENTRALITY_MIN_CHANGE = float(os.getenv("KG_CENTRALITY_MIN_CHANGE", "0.1"))
+
+# Graph size at the last PageRank computation: {"nodes": int, "edges": int}
+centrality_counts: Dict[str, int] = {}
+centrality_lock = threading.Lock()
+
+def centrality_is_stale(last_counts: Dict[str, int], nodes: int, edges: int, min_change: float) -> bool:
+    """Return True if the graph changed enough since `last_counts` to recompute PageRank."""
+    if not last_counts:
+        return nodes > 0
+    previous = last_counts["nodes"] + last_counts["edges"]
+    changed = abs(nodes - last_counts["nodes"]) + abs(edges - last_counts["edges"])
+    return changed > 0 and changed >= min_change * max(previous, 1)
+
+def pagerank(
+    names: List[str],
+    edges: List[Tuple[str, str]],
+    damping: float = 0.85,
+    iterations: int = 20
+) -> Dict[str, float]:
+    """
+    Compute PageRank by power iteration. Scores sum to 1.
+    Edges referring to unknown names are ignored.
+    """
+    if not names:
+        return {}
+
+    n = len(names)
+    out_links: Dict[str, List[str]] = {name: [] for name in names}
+    for source, target in edges:
+        if source in out_links and target in out_links:
+            out_links[source].append(target)
+
+    ranks = {name: 1.0 / n for name in names}
+    for _ in range(iterations):
+        # Mass of dangling nodes is spread uniformly
+        dangling = sum(ranks[name] for name in names if not out_links[name])
+        base = (1.0 - damping) / n + damping * dangling / n
+        new_ranks = {name: base for name in names}
+        for source, targets in out_links.items():
+            if targets:
+                share = damping * ranks[source] / len(targets)
+                for target in targets:
+                    new_ranks[target] += share
+        ranks = new_ranks
+    return ranks
+
 class Neo4jClient:
     """
     Wrapper for Neo4j database operations.
@@ -17,6 +134,8 @@ class Neo4jClient:
         password = os.getenv("NEO4J_PASSWORD", "password")
         
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.query_timeout = float(os.getenv("KG_QUERY_TIMEOUT", "30"))
+        self.max_fetch_size = int(os.getenv("KG_QUERY_MAX_FETCH_SIZE", "1000"))
 
     def close(self):
         self.driver.close()
@@ -33,6 +152,7 @@ class Neo4jClient:
                     name=entity.name, type=entity.type, description=entity.description
                 ).consume()
             )
+        query_cache.invalidate()
 
     def add_relation(self, relation: Relation):
         """Add a relationship between two entities."""
@@ -49,6 +169,7 @@ class Neo4jClient:
                     type=relation.type, description=relation.description
                 ).consume()
             )
+        query_cache.invalidate()
 
     def add_graph(self, entities: List[Entity], relations: List[Relation]):
         """Batch add entities and relations."""
@@ -58,6 +179,99 @@ class Neo4jClient:
         for relation in relations:
             self.add_relation(relation)
     
+    def update_centrality(self, force: bool = False, damping: float = 0.85, iterations: int = 20) -> bool:
+        """
+        Compute PageRank over the entity graph and cache it on nodes as `e.pagerank`.
+        Skipped unless the graph changed by at least KG_CENTRALITY_MIN_CHANGE since the
+        last run (or `force` is set). Uses GDS `gds.pageRank.write` when the plugin is
+        installed, and computes it in Python if GDS is missing or fails.
+
+        Returns:
+            True if centrality was recomputed.
+        """
+        # Skip if another ingest is already recomputing
+        if not centrality_lock.acquire(blocking=False):
+            return False
+        try:
+            with self.driver.session() as session:
+                # Both counts are served from Neo4j's count store
+                nodes = session.run("MATCH (e:Entity) RETURN count(e) AS c").single()["c"]
+                edges = session.run("MATCH ()-[r:RELATION]->() RETURN count(r) AS c").single()["c"]
+            if not force and not centrality_is_stale(centrality_counts, nodes, edges, CENTRALITY_MIN_CHANGE):
+                return False
+
+            computed = False
+            if self._gds_available():
+                try:
+                    self._write_gds_pagerank(damping, iterations)
+                    computed = True
+                except Exception as e:
+                    # e.g. GDS refuses to project a RELATION type that does not exist yet
+                    print(f"GDS PageRank failed, falling back to Python: {e}")
+            if not computed:
+                self._write_python_pagerank(damping, iterations)
+
+            centrality_counts.update(nodes=nodes, edges=edges)
+            query_cache.invalidate()
+            return True
+        finally:
+            centrality_lock.release()
+
+    def _gds_available(self) -> bool:
+        try:
+            with self.driver.session() as session:
+                record = session.run(
+                    "SHOW PROCEDURES YIELD name WHERE name = 'gds.pageRank.write' RETURN count(*) > 0 AS available"
+                ).single()
+                return bool(record and record["available"])
+        except Exception:
+            return False
+
+    def _write_gds_pagerank(self, damping: float, iterations: int):
+        """Run PageRank inside Neo4j with the Graph Data Science plugin."""
+        graph_name = f"kg-pagerank-{uuid.uuid4().hex}"
+        with self.driver.session() as session:
+            session.run(
+                "CALL gds.graph.project($graph, 'Entity', 'RELATION')", graph=graph_name
+            ).consume()
+            try:
+                session.run(
+                    """
+                    CALL gds.pageRank.write($graph, {
+                        writeProperty: 'pagerank', dampingFactor: $damping, maxIterations: $iterations
+                    })
+                    """,
+                    graph=graph_name, damping=damping, iterations=iterations
+                ).consume()
+            finally:
+                session.run("CALL gds.graph.drop($graph, false)", graph=graph_name).consume()
+
+    def _write_python_pagerank(self, damping: float, iterations: int):
+        """Fallback: load the graph into memory and compute PageRank here."""
+        with self.driver.session() as session:
+            names = [r["name"] for r in session.run("MATCH (e:Entity) RETURN e.name AS name")]
+            edges = [
+                (r["source"], r["target"]) for r in session.run(
+                    "MATCH (s:Entity)-[:RELATION]->(t:Entity) RETURN s.name AS source, t.name AS target"
+                )
+            ]
+        ranks = pagerank(names, edges, damping, iterations)
+        if not ranks:
+            return
+
+        rows = [{"name": name, "score": score} for name, score in ranks.items()]
+        with self.driver.session() as session:
+            session.execute_write(
+                lambda tx: tx.run(
+                    """
+                    UNWIND $rows AS row
+                    MATCH (e:Entity {name: row.name})
+                    SET e.pagerank = row.score
+                    """,
+                    rows=rows
+                ).consume()
+            )
+
     def get_all_graph(self):
         """Get all entities and relations from the graph."""
         with self.driver.session() as session:
@@ -85,9 +299,100 @@ class Neo4jClient:
         """Clear the entire database."""
         with self.driver.session() as session:
             session.execute_write(lambda tx: tx.run("MATCH (n) DETACH DELETE n").consume())
+        query_cache.invalidate()
 
     def query(self, cypher: str, **parameters):
         """Run a raw Cypher query."""
         with self.driver.session() as session:
             result = session.run(cypher, **parameters)
-            return [record.data() for record in result]
+            records = [record.data() for record in result]
+        if is_write_query(cypher):
+            query_cache.invalidate()
+        return records
+
+    def stream_query(
+        self,
+        cypher: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        limit: Optional[int] = None,
+        read_only: bool = True,
+        fetch_size: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield records of a Cypher query inside a single guarded transaction.
+
+        Args:
+            cypher: The Cypher statement.
+            parameters: Query parameters.
+            timeout: Server-side transaction timeout in seconds, capped at KG_QUERY_TIMEOUT.
+            limit: Stop after this many rows; the rest of the result is discarded.
+            read_only: Run the transaction in READ access mode and roll it back afterwards.
+            fetch_size: Number of records pulled from the server per batch,
+                capped at `limit` and KG_QUERY_MAX_FETCH_SIZE.
+        """
+        timeout = min(timeout or self.query_timeout, self.query_timeout)
+        fetch_size = min(fetch_size or self.max_fetch_size, self.max_fetch_size)
+        if limit is not None:
+            fetch_size = max(1, min(fetch_size, limit))
+        session_kwargs: Dict[str, Any] = {
+            "default_access_mode": READ_ACCESS if read_only else WRITE_ACCESS,
+            "fetch_size": fetch_size
+        }
+
+        with self.driver.session(**session_kwargs) as session:
+            with session.begin_transaction(timeout=timeout) as tx:
+                result = tx.run(cypher, parameters or {})
+                count = 0
+                for record in result:
+                    yield record.data()
+                    count += 1
+                    # Stop before pulling another batch from the server
+                    if limit is not None and count >= limit:
+                        break
+                if read_only:
+                    tx.rollback()
+                else:
+                    tx.commit()
+
+        if not read_only:
+            query_cache.invalidate()
+
+    def run_query(
+        self,
+        cypher: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        limit: Optional[int] = None,
+        read_only: bool = True,
+        fetch_size: Optional[int] = None,
+        use_cache: bool = False
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Run a guarded Cypher query and materialize at most `limit` rows.
+        Read-only queries can be served from the shared result cache.
+
+        Returns:
+            Tuple containing (records, truncated)
+        """
+        cacheable = use_cache and read_only and not is_write_query(cypher)
+        if cacheable:
+            key = QueryCache.make_key(cypher, parameters, limit)
+            generation = query_cache.generation
+            cached = query_cache.get(key)
+            if cached is not None:
+                return cached
+
+        # Fetch one extra row to detect truncation
+        fetch_limit = None if limit is None else limit + 1
+        records = list(self.stream_query(
+            cypher, parameters, timeout=timeout, limit=fetch_limit,
+            read_only=read_only, fetch_size=fetch_size
+        ))
+        truncated = limit is not None and len(records) > limit
+        if truncated:
+            records = records[:limit]
+
+        if cacheable:
+            query_cache.put(key, (records, truncated), generation)
+        return records, truncated
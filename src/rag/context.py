@@ -0,0 +1,112 @@
+import re
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+# Relation types that usually carry more answer-relevant information get a higher weight.
+# Unknown types fall back to DEFAULT_RELATION_WEIGHT.
+DEFAULT_RELATION_WEIGHTS: Dict[str, float] = {
+    "IS_A": 1.0,
+    "PART_OF": 0.9,
+    "WORKS_FOR": 0.9,
+    "FOUNDED": 0.9,
+    "LOCATED_IN": 0.8,
+    "RELATED_TO": 0.4,
+    "MENTIONS": 0.3,
+}
+DEFAULT_RELATION_WEIGHT = 0.6
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def text_terms(text: str) -> set:
+    """Lowercased words of three or more characters, used for query overlap."""
+    return {t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) > 2}
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return max(1, (len(text) + 3) // 4)
+
+class ContextFact(BaseModel):
+    """A candidate fact (one edge around a query entity) for the RAG prompt."""
+    source: str
+    relation: str
+    target: str
+    description: Optional[str] = None
+    anchor: str = Field(..., description="The query entity this fact was retrieved for.")
+    centrality: float = 0.0
+
+    def to_line(self) -> str:
+        line = f"{self.source} {self.relation} {self.target}"
+        if self.description:
+            line += f" ({self.description})"
+        return line
+
+class ContextBuilder:
+    """
+    Scores candidate facts and selects the best ones within a token budget.
+
+    score = relation weight
+            + centrality_weight * centrality (normalized over candidates)
+            + overlap_weight * fraction of query terms found in the fact
+    Each further fact from the same anchor entity is discounted by `anchor_decay`,
+    so a hub entity cannot crowd out the others.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 2000,
+        relation_weights: Optional[Dict[str, float]] = None,
+        centrality_weight: float = 0.5,
+        overlap_weight: float = 1.0,
+        anchor_decay: float = 0.85
+    ):
+        self.token_budget = token_budget
+        self.relation_weights = relation_weights if relation_weights is not None else DEFAULT_RELATION_WEIGHTS
+        self.centrality_weight = centrality_weight
+        self.overlap_weight = overlap_weight
+        self.anchor_decay = anchor_decay
+
+    def score(self, fact: ContextFact, query_terms: set, max_centrality: float) -> float:
+        relation_weight = self.relation_weights.get(fact.relation.upper(), DEFAULT_RELATION_WEIGHT)
+        centrality = fact.centrality / max_centrality if max_centrality > 0 else 0.0
+        overlap = 0.0
+        if query_terms:
+            overlap = len(query_terms & text_terms(fact.to_line())) / len(query_terms)
+        return relation_weight + self.centrality_weight * centrality + self.overlap_weight * overlap
+
+    def select(self, facts: List[ContextFact], query: str) -> List[ContextFact]:
+        """
+        Return the highest scoring distinct facts that fit in the token budget.
+        Ordering is deterministic: by score, then by the fact text.
+        """
+        query_terms = text_terms(query)
+        max_centrality = max((f.centrality for f in facts), default=0.0)
+
+        unique: Dict[str, ContextFact] = {}
+        for fact in facts:
+            unique.setdefault(fact.to_line(), fact)
+
+        scores = {line: self.score(fact, query_terms, max_centrality) for line, fact in unique.items()}
+        base_ranked = sorted(unique.items(), key=lambda item: (-scores[item[0]], item[0]))
+
+        # Diminishing returns per anchor entity
+        seen_per_anchor: Dict[str, int] = {}
+        adjusted = []
+        for line, fact in base_ranked:
+            rank = seen_per_anchor.get(fact.anchor, 0)
+            seen_per_anchor[fact.anchor] = rank + 1
+            adjusted.append((-scores[line] * (self.anchor_decay ** rank), line, fact))
+        adjusted.sort(key=lambda item: (item[0], item[1]))
+
+        selected = []
+        used_tokens = 0
+        for _, line, fact in adjusted:
+            cost = estimate_tokens(line)
+            if used_tokens + cost > self.token_budget:
+                continue
+            selected.append(fact)
+            used_tokens += cost
+        return selected
+
+    def build(self, facts: List[ContextFact], query: str) -> str:
+        """Render the selected facts as newline separated context lines."""
+        return "\n".join(fact.to_line() for fact in self.select(facts, query))
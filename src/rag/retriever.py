@@ -1,23 +1,32 @@
 import os
-from typing import List
+from typing import List, Optional
 from openai import OpenAI
 from ..graph.client import Neo4jClient
 from ..extraction.extractor import GraphExtractor
+from .context import ContextBuilder, ContextFact, text_terms
+
+# Upper bound on candidate facts fetched per query entity before ContextBuilder ranks them.
+# Only a safety cap for very large hubs; ranking itself happens in ContextBuilder.
+CANDIDATES_PER_ENTITY = int(os.getenv("KG_CONTEXT_CANDIDATES_PER_ENTITY", "500"))
 
 class GraphRetriever:
     """
     Performs Retrieval-Augmented Generation using the Knowledge Graph.
     """
     
-    def __init__(self):
+    def __init__(self, token_budget: Optional[int] = None):
         self.client = OpenAI() # Standard client for generation
         self.extractor = GraphExtractor() # To extract entities from query
         self.neo4j = Neo4jClient()
+        if token_budget is None:
+            token_budget = int(os.getenv("KG_CONTEXT_TOKEN_BUDGET", "2000"))
+        self.context_builder = ContextBuilder(token_budget=token_budget)
 
     def _get_context(self, query: str) -> str:
         """
         Retrieve relevant context from the graph based on the query.
-        Strategy: Extract entities from query -> Find them in Graph -> Get 1-hop neighbors.
+        Strategy: Extract entities from query -> Find them in Graph -> Get 1-hop neighbors
+        -> Rank the facts and keep the best ones within the token budget.
         """
         # 1. Extract potential entities from the query itself
         # We use a relaxed extraction or just keywords. 
@@ -29,27 +38,44 @@ class GraphRetriever:
             # Fallback: simple keyword splitting if extraction fails or is too strict
             query_entities = query.split()
 
-        context_lines = []
+        candidates: List[ContextFact] = []
+        terms = sorted(text_terms(query))
         
         for entity_name in query_entities:
-            # Cypher query to get the entity and its immediate relationships
+            # Cypher query to get the entity's immediate relationships.
+            # If the cap is hit, facts mentioning query terms are kept first (not the most
+            # central ones), so hubs cannot push relevant facts out before ranking.
+            # Centrality is precomputed by Neo4jClient.update_centrality().
             cypher = """
-            MATCH (e:Entity {name: $name})-[r]-(neighbor)
-            RETURN e.name, type(r) as rel, neighbor.name, neighbor.description
-            LIMIT 10
+            MATCH (e:Entity {name: $name})-[r]-(neighbor:Entity)
+            WITH e, r, neighbor,
+                 toLower(neighbor.name + ' ' + coalesce(r.type, type(r)) + ' ' + coalesce(neighbor.description, '')) AS text
+            RETURN e.name AS name, coalesce(r.type, type(r)) AS rel, startNode(r) = e AS outgoing,
+                   neighbor.name AS neighbor, neighbor.description AS description,
+                   coalesce(neighbor.pagerank, 0.0) AS centrality
+            ORDER BY size([t IN $terms WHERE text CONTAINS t]) DESC, neighbor, rel
+            LIMIT $limit
             """
-            results = self.neo4j.query(cypher, name=entity_name)
+            results = self.neo4j.query(cypher, name=entity_name, terms=terms, limit=CANDIDATES_PER_ENTITY)
             
             for row in results:
-                line = f"{row['e.name']} {row['rel']} {row['neighbor.name']}"
-                if row['neighbor.description']:
-                     line += f" ({row['neighbor.description']})"
-                context_lines.append(line)
+                source, target = row['name'], row['neighbor']
+                if not row['outgoing']:
+                    source, target = target, source
+                candidates.append(ContextFact(
+                    source=source,
+                    relation=row['rel'],
+                    target=target,
+                    description=row['description'],
+                    anchor=entity_name,
+                    centrality=row['centrality']
+                ))
                 
-        if not context_lines:
+        context = self.context_builder.build(candidates, query)
+        if not context:
             return "No relevant graph data found."
             
-        return "\n".join(list(set(context_lines))) # Remove duplicates
+        return context
 
     def answer(self, query: str) -> str:
         """
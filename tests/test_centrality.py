@@ -0,0 +1,68 @@
+import pytest
+from src.graph.client import centrality_is_stale, pagerank
+
+def test_pagerank_sums_to_one_and_ranks_hub_highest():
+    names = ["Hub", "A", "B", "C"]
+    edges = [("A", "Hub"), ("B", "Hub"), ("C", "Hub")]
+    ranks = pagerank(names, edges)
+
+    assert sum(ranks.values()) == pytest.approx(1.0)
+    assert max(ranks, key=ranks.get) == "Hub"
+    assert ranks["A"] == pytest.approx(ranks["B"]) == pytest.approx(ranks["C"])
+
+def test_pagerank_symmetric_cycle_is_uniform():
+    ranks = pagerank(["A", "B", "C"], [("A", "B"), ("B", "C"), ("C", "A")])
+    for score in ranks.values():
+        assert score == pytest.approx(1 / 3)
+
+def test_pagerank_ignores_unknown_names_and_empty_graph():
+    assert pagerank([], []) == {}
+    ranks = pagerank(["A", "B"], [("A", "Missing"), ("A", "B")])
+    assert set(ranks) == {"A", "B"}
+    assert ranks["B"] > ranks["A"]
+
+def test_centrality_recompute_is_throttled():
+    # First computation as soon as there is a graph
+    assert centrality_is_stale({}, nodes=5, edges=3, min_change=0.1)
+    assert not centrality_is_stale({}, nodes=0, edges=0, min_change=0.1)
+
+    last = {"nodes": 100, "edges": 100}
+    assert not centrality_is_stale(last, nodes=100, edges=100, min_change=0.1)
+    assert not centrality_is_stale(last, nodes=105, edges=110, min_change=0.1)
+    assert centrality_is_stale(last, nodes=110, edges=110, min_change=0.1)
+
+class FakeCountSession:
+    def run(self, cypher, **params):
+        return self
+
+    def single(self):
+        return {"c": 3}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class FakeCountDriver:
+    def session(self, **kwargs):
+        return FakeCountSession()
+
+def test_update_centrality_falls_back_to_python_when_gds_fails(monkeypatch):
+    import src.graph.client as client_module
+
+    monkeypatch.setattr(client_module.GraphDatabase, "driver", lambda *args, **kwargs: FakeCountDriver())
+    monkeypatch.setattr(client_module, "centrality_counts", {})
+    client = client_module.Neo4jClient()
+    fallback_calls = []
+
+    def failing_gds(damping, iterations):
+        raise RuntimeError("Could not find relationship type 'RELATION'")
+
+    monkeypatch.setattr(client, "_gds_available", lambda: True)
+    monkeypatch.setattr(client, "_write_gds_pagerank", failing_gds)
+    monkeypatch.setattr(client, "_write_python_pagerank", lambda damping, iterations: fallback_calls.append(1))
+
+    assert client.update_centrality()
+    assert fallback_calls == [1]
+    assert client_module.centrality_counts == {"nodes": 3, "edges": 3}
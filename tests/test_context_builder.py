@@ -0,0 +1,32 @@
+from src.rag.context import ContextBuilder, ContextFact, estimate_tokens
+
+def make_fact(target, relation="RELATED_TO", anchor="Tesla", centrality=0.0, description=None):
+    return ContextFact(
+        source=anchor, relation=relation, target=target,
+        description=description, anchor=anchor, centrality=centrality
+    )
+
+def test_ranking_and_stable_order():
+    builder = ContextBuilder(token_budget=1000)
+    facts = [
+        make_fact("Shanghai", relation="LOCATED_IN"),
+        make_fact("Elon Musk", relation="FOUNDED", centrality=0.5),
+        make_fact("Electric Cars", centrality=0.1),
+        make_fact("Elon Musk", relation="FOUNDED", centrality=0.5),  # duplicate
+    ]
+    selected = builder.select(facts, "Who founded Tesla?")
+    assert [f.target for f in selected] == ["Elon Musk", "Shanghai", "Electric Cars"]
+    assert builder.select(list(reversed(facts)), "Who founded Tesla?") == selected
+
+def test_token_budget_is_respected():
+    facts = [make_fact(f"Entity {i}", description="x" * 40) for i in range(20)]
+    budget = 50
+    selected = ContextBuilder(token_budget=budget).select(facts, "Tesla")
+    assert selected
+    assert sum(estimate_tokens(f.to_line()) for f in selected) <= budget
+
+def test_hub_entity_does_not_crowd_out_others():
+    hub_facts = [make_fact(f"Product {i}", anchor="Hub", relation="PART_OF") for i in range(10)]
+    other = make_fact("Berlin", anchor="Tesla", relation="RELATED_TO")
+    selected = ContextBuilder(token_budget=30).select(hub_facts + [other], "hub tesla")
+    assert other in selected
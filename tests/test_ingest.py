@@ -0,0 +1,188 @@
+import os
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+import src.api.routes as routes
+from src.api.main import app
+from src.extraction.schema import KnowledgeGraphExtraction
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(routes, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(routes, "jobs", {})
+    monkeypatch.setattr(routes, "jobs_by_hash", {})
+    return tmp_path
+
+@pytest.fixture
+def processed(monkeypatch):
+    calls = []
+    monkeypatch.setattr(routes, "process_document", lambda job_id, temp_file: calls.append(job_id))
+    return calls
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+def upload(client, content: bytes, filename: str = "doc.txt"):
+    return client.post("/ingest", files={"file": (filename, content, "text/plain")})
+
+def test_duplicate_upload_attaches_to_existing_job(client, spool_dir, processed):
+    first = upload(client, b"Alice works for Google.")
+    second = upload(client, b"Alice works for Google.", filename="copy.txt")
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.json()["duplicate"] is False
+    assert second.json() == {"job_id": first.json()["job_id"], "duplicate": True}
+    assert processed == [first.json()["job_id"]]
+    # Only the first upload's spool file remains
+    assert len(os.listdir(spool_dir)) == 1
+
+def test_failed_job_does_not_block_reupload(client, spool_dir, processed):
+    first = upload(client, b"Alice works for Google.").json()["job_id"]
+    routes.jobs[first]["status"] = "failed"
+
+    second = upload(client, b"Alice works for Google.").json()
+    assert second["duplicate"] is False
+    assert second["job_id"] != first
+
+def test_oversized_upload_is_rejected_and_spool_removed(client, spool_dir, processed, monkeypatch):
+    monkeypatch.setattr(routes, "MAX_UPLOAD_BYTES", 10)
+
+    response = upload(client, b"x" * 11)
+    assert response.status_code == 413
+    assert os.listdir(spool_dir) == []
+    assert routes.jobs == {}
+    assert processed == []
+
+def test_oversized_content_length_is_rejected_early(client, spool_dir, processed, monkeypatch):
+    monkeypatch.setattr(routes, "MAX_UPLOAD_BYTES", 10)
+
+    response = upload(client, b"x" * (routes.MULTIPART_OVERHEAD_BYTES + 100))
+    assert response.status_code == 413
+    assert os.listdir(spool_dir) == []
+    assert processed == []
+
+def test_chunked_upload_is_aborted_while_receiving(client, spool_dir, processed, monkeypatch):
+    monkeypatch.setattr(routes, "MAX_UPLOAD_BYTES", 10)
+    boundary = "kgfoundryboundary"
+    chunk_size = 16 * 1024
+    total_chunks = 64  # 1 MiB, far beyond the limit plus multipart allowance
+
+    def body():
+        yield (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="big.txt"\r\n'
+            "Content-Type: text/plain\r\n\r\n"
+        ).encode()
+        for _ in range(total_chunks):
+            yield b"x" * chunk_size
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    # A generator body is sent with chunked encoding and no Content-Length
+    response = client.post(
+        "/ingest",
+        content=body(),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    )
+    assert response.status_code == 413
+    assert os.listdir(spool_dir) == []
+    assert processed == []
+
+def test_upload_limit_middleware_stops_reading_body_early(monkeypatch):
+    monkeypatch.setattr(routes, "MAX_UPLOAD_BYTES", 10)
+    chunk = b"x" * (16 * 1024)
+    total_chunks = 64
+    pulled = []
+    sent = []
+
+    async def receive():
+        pulled.append(1)
+        return {"type": "http.request", "body": chunk, "more_body": len(pulled) < total_chunks}
+
+    async def send(message):
+        sent.append(message)
+
+    async def downstream(scope, receive, send):
+        # Drain the body like Starlette's form parser does
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get("more_body", False)
+
+    scope = {"type": "http", "method": "POST", "path": "/ingest", "headers": []}
+    middleware = routes.UploadSizeLimitMiddleware(downstream)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(middleware(scope, receive, send))
+
+    assert exc_info.value.status_code == 413
+    limit = routes.MAX_UPLOAD_BYTES + routes.MULTIPART_OVERHEAD_BYTES
+    assert len(pulled) == limit // len(chunk) + 1
+
+class FakeNeo4jClient:
+    fail = False
+    closed = 0
+
+    def add_graph(self, entities, relations):
+        if self.fail:
+            raise RuntimeError("Neo4j unavailable")
+
+    def update_centrality(self):
+        pass
+
+    def clear_database(self):
+        pass
+
+    def close(self):
+        FakeNeo4jClient.closed += 1
+
+class FakeExtractor:
+    def extract(self, text, progress_callback=None):
+        return KnowledgeGraphExtraction()
+
+class FakeValidator:
+    def validate_graph(self, entities, relations):
+        return True, None, ""
+
+def test_clear_resets_deduplication(client, spool_dir, processed, monkeypatch):
+    monkeypatch.setattr(routes, "Neo4jClient", FakeNeo4jClient)
+    first = upload(client, b"Alice works for Google.").json()["job_id"]
+    routes.jobs[first]["status"] = "completed"
+
+    assert client.post("/clear").status_code == 200
+    second = upload(client, b"Alice works for Google.").json()
+    assert second["duplicate"] is False
+    assert second["job_id"] != first
+
+def test_failed_storage_does_not_block_reupload(client, spool_dir, monkeypatch):
+    class FailingNeo4jClient(FakeNeo4jClient):
+        fail = True
+
+    monkeypatch.setattr(routes, "Neo4jClient", FailingNeo4jClient)
+    monkeypatch.setattr(routes, "GraphExtractor", FakeExtractor)
+    monkeypatch.setattr(routes, "GraphValidator", FakeValidator)
+
+    first = upload(client, b"Alice works for Google.").json()["job_id"]
+    assert routes.jobs[first]["status"] == "completed"
+
+    second = upload(client, b"Alice works for Google.").json()
+    assert second["duplicate"] is False
+    assert second["job_id"] != first
+
+def test_centrality_failure_keeps_dedup_and_closes_client(client, spool_dir, monkeypatch):
+    class CentralityFailingClient(FakeNeo4jClient):
+        def update_centrality(self):
+            raise RuntimeError("GDS projection failed")
+
+    monkeypatch.setattr(routes, "Neo4jClient", CentralityFailingClient)
+    monkeypatch.setattr(routes, "GraphExtractor", FakeExtractor)
+    monkeypatch.setattr(routes, "GraphValidator", FakeValidator)
+    monkeypatch.setattr(FakeNeo4jClient, "closed", 0)
+
+    first = upload(client, b"Alice works for Google.").json()["job_id"]
+    assert routes.jobs[first]["status"] == "completed"
+    assert FakeNeo4jClient.closed == 1
+
+    # The graph was written, so an identical upload still attaches to the job
+    second = upload(client, b"Alice works for Google.").json()
+    assert second == {"job_id": first, "duplicate": True}
@@ -0,0 +1,28 @@
+from src.graph.client import QueryCache, is_write_query
+
+def test_write_query_detection():
+    assert not is_write_query("MATCH (n:Entity) RETURN n.name LIMIT 5")
+    assert is_write_query("MATCH (n) DETACH DELETE n")
+    assert is_write_query("merge (e:Entity {name: $name})")
+
+def test_query_cache_lru_and_invalidation():
+    cache = QueryCache(max_entries=2, ttl=60)
+    key_a = QueryCache.make_key("MATCH (n) RETURN n", {"x": 1}, 10)
+    key_b = QueryCache.make_key("MATCH (n) RETURN n", {"x": 2}, 10)
+    key_c = QueryCache.make_key("MATCH (n) RETURN n.name", {}, 10)
+
+    cache.put(key_a, "a", cache.generation)
+    cache.put(key_b, "b", cache.generation)
+    assert cache.get(key_a) == "a"
+
+    # key_b is least recently used and gets evicted
+    cache.put(key_c, "c", cache.generation)
+    assert cache.get(key_b) is None
+    assert cache.get(key_c) == "c"
+
+    # Results computed before a write must not be stored
+    stale_generation = cache.generation
+    cache.invalidate()
+    assert cache.get(key_a) is None
+    cache.put(key_a, "stale", stale_generation)
+    assert cache.get(key_a) is None
@@ -0,0 +1,208 @@
+import json
+from fastapi.testclient import TestClient
+from neo4j.exceptions import ClientError
+import src.api.routes as routes
+import src.graph.client as client_module
+from src.api.main import app
+from neo4j import READ_ACCESS, WRITE_ACCESS
+from src.extraction.schema import Entity
+from src.graph.client import Neo4jClient, QueryCache
+
+class FakeRecord:
+    def __init__(self, value):
+        self.value = value
+
+    def data(self):
+        return {"n": self.value}
+
+class FakeTransaction:
+    def __init__(self, driver, timeout):
+        driver.timeouts.append(timeout)
+        self.driver = driver
+
+    def run(self, cypher, parameters):
+        for i in range(self.driver.total_rows):
+            self.driver.pulled += 1
+            yield FakeRecord(i)
+
+    def rollback(self):
+        self.driver.outcomes.append("rollback")
+
+    def commit(self):
+        self.driver.outcomes.append("commit")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class FakeWriteTransaction:
+    def run(self, cypher, **parameters):
+        return self
+
+    def consume(self):
+        pass
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def begin_transaction(self, timeout=None):
+        return FakeTransaction(self.driver, timeout)
+
+    def execute_write(self, work):
+        self.driver.outcomes.append("execute_write")
+        return work(FakeWriteTransaction())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class FakeDriver:
+    def __init__(self, total_rows=100):
+        self.total_rows = total_rows
+        self.pulled = 0
+        self.timeouts = []
+        self.session_kwargs = []
+        self.outcomes = []
+
+    def session(self, **kwargs):
+        self.session_kwargs.append(kwargs)
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+def make_client(monkeypatch, driver):
+    monkeypatch.setenv("KG_QUERY_TIMEOUT", "30")
+    monkeypatch.setenv("KG_QUERY_MAX_FETCH_SIZE", "500")
+    monkeypatch.setattr(client_module.GraphDatabase, "driver", lambda *args, **kwargs: driver)
+    return Neo4jClient()
+
+def test_oversized_timeout_is_clamped(monkeypatch):
+    driver = FakeDriver()
+    client = make_client(monkeypatch, driver)
+
+    list(client.stream_query("MATCH (n) RETURN n", timeout=1e9, limit=5))
+    list(client.stream_query("MATCH (n) RETURN n", timeout=2, limit=5))
+    list(client.stream_query("MATCH (n) RETURN n", limit=5))
+
+    assert driver.timeouts == [30.0, 2, 30.0]
+
+def test_fetch_size_is_clamped_to_limit_and_server_max(monkeypatch):
+    driver = FakeDriver(total_rows=100)
+    client = make_client(monkeypatch, driver)
+
+    rows = list(client.stream_query("MATCH (n) RETURN n", limit=10, fetch_size=10_000_000))
+    assert len(rows) == 10
+    assert driver.session_kwargs[-1]["fetch_size"] == 10
+    assert driver.pulled == 10
+
+    list(client.stream_query("MATCH (n) RETURN n", fetch_size=10_000_000))
+    assert driver.session_kwargs[-1]["fetch_size"] == 500
+
+def test_run_query_reports_truncation(monkeypatch):
+    driver = FakeDriver(total_rows=100)
+    client = make_client(monkeypatch, driver)
+
+    rows, truncated = client.run_query("MATCH (n) RETURN n", limit=10)
+    assert len(rows) == 10
+    assert truncated
+    assert driver.session_kwargs[-1]["fetch_size"] == 11
+
+def test_queries_are_read_only_and_rolled_back_by_default(monkeypatch):
+    driver = FakeDriver(total_rows=3)
+    client = make_client(monkeypatch, driver)
+
+    list(client.stream_query("MATCH (n) RETURN n"))
+    assert driver.session_kwargs[-1]["default_access_mode"] == READ_ACCESS
+    assert driver.outcomes == ["rollback"]
+
+    list(client.stream_query("CREATE (n:Entity {name: 'x'}) RETURN n", read_only=False))
+    assert driver.session_kwargs[-1]["default_access_mode"] == WRITE_ACCESS
+    assert driver.outcomes == ["rollback", "commit"]
+
+def test_run_query_serves_repeated_reads_from_cache_until_a_write(monkeypatch):
+    monkeypatch.setattr(client_module, "query_cache", QueryCache(max_entries=8, ttl=60))
+    driver = FakeDriver(total_rows=3)
+    client = make_client(monkeypatch, driver)
+    cypher = "MATCH (n:Entity {name: $name}) RETURN n"
+
+    first = client.run_query(cypher, {"name": "Alice"}, limit=10, use_cache=True)
+    second = client.run_query(cypher, {"name": "Alice"}, limit=10, use_cache=True)
+    assert first == second
+    assert len(driver.session_kwargs) == 1
+
+    # Different parameters are a different cache entry
+    client.run_query(cypher, {"name": "Bob"}, limit=10, use_cache=True)
+    assert len(driver.session_kwargs) == 2
+
+    # Writes through the client invalidate cached reads
+    client.add_entity(Entity(name="Carol", type="Person"))
+    client.run_query(cypher, {"name": "Alice"}, limit=10, use_cache=True)
+    assert len(driver.session_kwargs) == 4
+
+    client.run_query("CREATE (n:Entity {name: 'x'})", read_only=False)
+    client.run_query(cypher, {"name": "Alice"}, limit=10, use_cache=True)
+    assert len(driver.session_kwargs) == 6
+
+def test_run_query_does_not_cache_writes_or_uncached_calls(monkeypatch):
+    monkeypatch.setattr(client_module, "query_cache", QueryCache(max_entries=8, ttl=60))
+    driver = FakeDriver(total_rows=3)
+    client = make_client(monkeypatch, driver)
+
+    client.run_query("MATCH (n) RETURN n", limit=10)
+    client.run_query("MATCH (n) RETURN n", limit=10)
+    assert len(driver.session_kwargs) == 2
+
+    client.run_query("MERGE (n:Entity {name: 'x'}) RETURN n", limit=10, use_cache=True)
+    client.run_query("MERGE (n:Entity {name: 'x'}) RETURN n", limit=10, use_cache=True)
+    assert len(driver.session_kwargs) == 4
+
+def make_streaming_client(rows, error=None):
+    class StreamingClient:
+        closed = False
+
+        def stream_query(self, cypher, parameters=None, **kwargs):
+            for row in rows:
+                yield row
+            if error is not None:
+                raise error
+
+        def close(self):
+            StreamingClient.closed = True
+
+    return StreamingClient
+
+def test_stream_endpoint_returns_400_for_errors_before_first_row(monkeypatch):
+    fake = make_streaming_client([], ClientError("Invalid input 'MTCH'"))
+    monkeypatch.setattr(routes, "Neo4jClient", fake)
+
+    response = TestClient(app).post("/query/stream", json={"query": "MTCH (n) RETURN n"})
+    assert response.status_code == 400
+    assert "MTCH" in response.json()["detail"]
+    assert fake.closed
+
+    monkeypatch.setattr(routes, "Neo4jClient", make_streaming_client([], RuntimeError("connection lost")))
+    response = TestClient(app).post("/query/stream", json={"query": "MATCH (n) RETURN n"})
+    assert response.status_code == 500
+
+def test_stream_endpoint_reports_mid_stream_errors_as_last_line(monkeypatch):
+    fake = make_streaming_client([{"n": 1}, {"n": 2}], RuntimeError("transaction timed out"))
+    monkeypatch.setattr(routes, "Neo4jClient", fake)
+
+    response = TestClient(app).post("/query/stream", json={"query": "MATCH (n) RETURN n"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"n": 1}, {"n": 2}, {"error": "transaction timed out"}]
+    assert fake.closed
+
+def test_stream_endpoint_with_no_rows_returns_empty_body(monkeypatch):
+    monkeypatch.setattr(routes, "Neo4jClient", make_streaming_client([]))
+    response = TestClient(app).post("/query/stream", json={"query": "MATCH (n) RETURN n"})
+    assert response.status_code == 200
+    assert response.text == ""
@@ -0,0 +1,42 @@
+from src.extraction.schema import Entity, KnowledgeGraphExtraction
+from src.rag import retriever as retriever_module
+from src.rag.context import ContextBuilder
+from src.rag.retriever import GraphRetriever
+
+class FakeExtractor:
+    def extract(self, text, progress_callback=None):
+        return KnowledgeGraphExtraction(entities=[Entity(name="Tesla", type="Organization")])
+
+class FakeNeo4j:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def query(self, cypher, **parameters):
+        self.calls.append(parameters)
+        return self.rows
+
+def make_retriever(rows, token_budget=40):
+    retriever = GraphRetriever.__new__(GraphRetriever)
+    retriever.extractor = FakeExtractor()
+    retriever.neo4j = FakeNeo4j(rows)
+    retriever.context_builder = ContextBuilder(token_budget=token_budget)
+    return retriever
+
+def row(neighbor, rel="RELATED_TO", centrality=0.0, description=None):
+    return {
+        "name": "Tesla", "rel": rel, "outgoing": True, "neighbor": neighbor,
+        "description": description, "centrality": centrality
+    }
+
+def test_low_centrality_fact_matching_query_survives_hub_neighbors():
+    hub_rows = [row(f"Supplier {i}", centrality=0.9) for i in range(60)]
+    relevant = row("Berlin Gigafactory", rel="LOCATED_IN", centrality=0.01)
+    retriever = make_retriever(hub_rows + [relevant])
+
+    context = retriever._get_context("Where is the Tesla gigafactory?")
+
+    assert "Tesla LOCATED_IN Berlin Gigafactory" in context.splitlines()
+    call = retriever.neo4j.calls[0]
+    assert call["limit"] == retriever_module.CANDIDATES_PER_ENTITY
+    assert "gigafactory" in call["terms"]